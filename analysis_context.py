@@ -1,38 +1,72 @@
+import functools
+import hashlib
 import json
+import mmap
 import os
+import sys
 from pathlib import Path
 from typing import Dict, Any, Optional
 from datetime import datetime
+from itertools import islice
+
+try:
+    import orjson
+except ImportError:  # optional dependency, fall back to stdlib json
+    orjson = None
+
+_TYPE_PYTHON = sys.intern('Python')
+
+@functools.lru_cache(maxsize=32)
+def _titleize(category: str) -> str:
+    """Turn an issue category key like 'large_files' into a heading."""
+    return category.replace('_', ' ').title()
 
 class AnalysisContextManager:
     """Manages analysis context for chat sessions."""
     
+    __slots__ = ('context_file', 'current_context', 'context_summary',
+                 '_summary_cache', '_context_prompt_str', '_context_prompt_bytes',
+                 '_last_payload_digest')
+    
     def __init__(self, context_file: str = "analysis_context.json"):
         self.context_file = context_file
         self.current_context = None
         self.context_summary = None
+        self._summary_cache = None  # (key, summary) for the most recent context
+        self._context_prompt_str = ''
+        self._context_prompt_bytes = None  # None until the prompt is built for the current context
+        self._last_payload_digest = {}  # path -> digest of the last payload written there
         
     def save_analysis_context(self, analysis_results: Dict[str, Any], project_path: str):
         """Save analysis results as context for future chat sessions."""
+        project_name = Path(project_path).name
+        key_files = self._extract_key_files(analysis_results)
         context_data = {
             'timestamp': datetime.now().isoformat(),
             'project_path': project_path,
-            'project_name': Path(project_path).name,
+            'project_name': project_name,
             'summary': analysis_results['summary'],
             'architecture': analysis_results['architecture'],
             'issues': analysis_results['issues'],
             'suggestions': analysis_results['suggestions'],
             'file_feedback': analysis_results['file_feedback'],
-            'key_files': self._extract_key_files(analysis_results),
-            'context_prompt': self._create_context_prompt(analysis_results, project_path)
+            'key_files': key_files
         }
+        # Store the summary with the context so loading does not have to rebuild it
+        context_data['_summary'] = self._cached_context_summary(context_data)
         
         try:
-            with open(self.context_file, 'w', encoding='utf-8') as f:
-                json.dump(context_data, f, indent=2, ensure_ascii=False)
-            
+            # Serialize up front and write the encoded bytes in a single call
+            if orjson is not None:
+                payload = orjson.dumps(context_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            else:
+                payload = json.dumps(context_data, indent=2, ensure_ascii=False,
+                                     separators=(',', ': ')).encode('utf-8')
+            self._write_atomic(self.context_file, payload)
+
             self.current_context = context_data
-            self.context_summary = self._create_context_summary(context_data)
+            self.context_summary = context_data['_summary']
+            self._reset_context_prompt()
             print(f"Analysis context saved for project: {context_data['project_name']}")
             
         except Exception as e:
@@ -44,25 +78,31 @@ class AnalysisContextManager:
             return None
             
         try:
-            with open(self.context_file, 'r', encoding='utf-8') as f:
-                self.current_context = json.load(f)
-                self.context_summary = self._create_context_summary(self.current_context)
-                return self.current_context
+            # Map the file instead of reading it so the parser works on the page cache directly
+            with open(self.context_file, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    self.current_context = self._load_json(mm)
+            self._intern_key_files(self.current_context)
+            self.context_summary = (self.current_context.get('_summary')
+                                    or self._cached_context_summary(self.current_context))
+            self._reset_context_prompt()
+            return self.current_context
         except Exception as e:
             print(f"Error loading analysis context: {e}")
             return None
     
     def get_context_for_chat(self, max_length: int = 2000) -> Optional[str]:
         """Get formatted context for chat prompts."""
-        if not self.current_context:
+        if self.current_context is None:
             return None
             
-        context = self.current_context.get('context_prompt', '')
-        if len(context) > max_length:
-            # Truncate but keep essential information
-            context = context[:max_length-100] + "\n\n[Context truncated for length...]"
+        self._ensure_context_prompt()
+        if len(self._context_prompt_bytes) <= max_length:
+            return self._context_prompt_str
         
-        return context
+        # Truncate but keep essential information; only the kept prefix is decoded
+        head = self._context_prompt_bytes[:max_length-100].decode('utf-8', errors='ignore')
+        return head + "\n\n[Context truncated for length...]"
     
     def get_context_summary(self) -> Optional[str]:
         """Get a brief summary of the current analysis context."""
@@ -78,6 +118,44 @@ class AnalysisContextManager:
             os.remove(self.context_file)
         self.current_context = None
         self.context_summary = None
+        self._summary_cache = None
+        self._reset_context_prompt()
+        self._last_payload_digest.clear()
+    
+    def _write_atomic(self, path: str, payload: bytes):
+        """Write payload to path via a temporary file, skipping the write if it is unchanged."""
+        digest = hashlib.blake2b(payload, digest_size=16).digest()
+        if (self._last_payload_digest.get(path) == digest
+                and os.path.exists(path) and os.path.getsize(path) == len(payload)):
+            return
+        
+        tmp_path = path + '.tmp'
+        # The payload is already one contiguous buffer, so skip Python's write buffer
+        with open(tmp_path, 'wb', buffering=0) as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        self._last_payload_digest[path] = digest
+    
+    def _load_json(self, mm: mmap.mmap) -> Dict[str, Any]:
+        """Decode a JSON context from a mapped file."""
+        if orjson is not None:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+        return json.loads(mm[:])
+    
+    def _intern_key_files(self, context_data: Dict[str, Any]):
+        """Share one string object per repeated file type and path in loaded key files."""
+        key_files = context_data.get('key_files')
+        if not key_files:
+            return
+        
+        interned = {}
+        for file_path, info in key_files.items():
+            file_type = info.get('type')
+            if isinstance(file_type, str):
+                info['type'] = sys.intern(file_type)
+            interned[sys.intern(file_path)] = info
+        context_data['key_files'] = interned
     
     def _extract_key_files(self, analysis_results: Dict[str, Any]) -> Dict[str, Any]:
         """Extract key files information for quick reference."""
@@ -85,9 +163,9 @@ class AnalysisContextManager:
         key_files = {}
         
         for file_path, info in file_analysis.items():
-            if info.get('type') == 'Python':
-                key_files[file_path] = {
-                    'type': info.get('type'),
+            if info.get('type') == _TYPE_PYTHON:
+                key_files[sys.intern(file_path)] = {
+                    'type': _TYPE_PYTHON,
                     'classes': len(info.get('classes', [])),
                     'functions': len(info.get('functions', [])),
                     'lines': info.get('line_count', 0),
@@ -96,50 +174,89 @@ class AnalysisContextManager:
         
         return key_files
     
-    def _create_context_prompt(self, analysis_results: Dict[str, Any], project_path: str) -> str:
+    def _create_context_prompt(self, context_data: Dict[str, Any]) -> str:
         """Create a comprehensive context prompt for chat."""
-        summary = analysis_results.get('summary', {})
-        architecture = analysis_results.get('architecture', {})
-        issues = analysis_results.get('issues', {})
+        project_path = context_data.get('project_path', '')
+        project_name = context_data.get('project_name', 'Unknown')
+        summary = context_data.get('summary', {})
+        architecture = context_data.get('architecture', {})
+        issues = context_data.get('issues', {})
+        key_files = context_data.get('key_files', {})
+        
+        # Look everything up once up front rather than inside the formatting below
+        total_files = summary.get('total_files', 0)
+        total_lines = summary.get('total_lines', 0)
+        issues_count = summary.get('issues_count', 0)
+        languages = summary.get('languages', {})
+        main_modules = architecture.get('main_modules') or ()
+        utils_modules = architecture.get('utils_modules') or ()
+        test_files = architecture.get('test_files') or ()
         
-        context = f"""# Project Analysis Context
+        parts = [f"""# Project Analysis Context
 
-## Project: {Path(project_path).name}
+## Project: {project_name}
 - **Location**: {project_path}
-- **Total Files**: {summary.get('total_files', 0)}
-- **Lines of Code**: {summary.get('total_lines', 0)}
-- **Languages**: {', '.join([f'{lang}: {count}' for lang, count in summary.get('languages', {}).items()])}
-- **Issues Found**: {summary.get('issues_count', 0)}
+- **Total Files**: {total_files}
+- **Lines of Code**: {total_lines}
+- **Languages**: {', '.join([f'{lang}: {count}' for lang, count in languages.items()])}
+- **Issues Found**: {issues_count}
 
 ## Architecture Overview
-"""
+"""]
         
-        if architecture.get('main_modules'):
-            context += f"- **Main Modules**: {', '.join(architecture['main_modules'][:3])}\n"
-        if architecture.get('utils_modules'):
-            context += f"- **Utility Modules**: {', '.join(architecture['utils_modules'][:3])}\n"
-        if architecture.get('test_files'):
-            context += f"- **Test Files**: {len(architecture['test_files'])}\n"
+        if main_modules:
+            parts.append(f"- **Main Modules**: {', '.join(islice(main_modules, 3))}\n")
+        if utils_modules:
+            parts.append(f"- **Utility Modules**: {', '.join(islice(utils_modules, 3))}\n")
+        if test_files:
+            parts.append(f"- **Test Files**: {len(test_files)}\n")
         
-        context += "\n## Key Issues\n"
+        parts.append("\n## Key Issues\n")
         for category, issue_list in issues.items():
-            if issue_list:
-                context += f"### {category.replace('_', ' ').title()}\n"
-                for issue in issue_list[:3]:  # Limit to 3 per category
-                    context += f"- {issue}\n"
+            if not issue_list:
+                continue
+            parts.append(f"### {_titleize(category)}\n")
+            parts.extend(f"- {issue}\n" for issue in islice(issue_list, 3))  # Limit to 3 per category
         
-        context += "\n## Available Files\n"
-        file_analysis = analysis_results.get('file_analysis', {})
-        for file_path, info in list(file_analysis.items())[:10]:  # First 10 files
-            if info.get('type') == 'Python':
-                context += f"- **{file_path}**: {info.get('line_count', 0)} lines, {len(info.get('classes', []))} classes, {len(info.get('functions', []))} functions\n"
+        parts.append("\n## Available Files\n")
+        # key_files is already restricted to Python files
+        for file_path, info in islice(key_files.items(), 10):  # First 10 files
+            parts.append(f"- **{file_path}**: {info['lines']} lines, {info['classes']} classes, {info['functions']} functions\n")
         
-        context += "\n## Usage Notes\n"
-        context += "- I have analyzed this codebase and can provide insights about its structure, issues, and improvements\n"
-        context += "- Ask me about specific files, functions, or architectural decisions\n"
-        context += "- I can suggest refactoring approaches or explain complex code sections\n"
+        parts.extend([
+            "\n## Usage Notes\n",
+            "- I have analyzed this codebase and can provide insights about its structure, issues, and improvements\n",
+            "- Ask me about specific files, functions, or architectural decisions\n",
+            "- I can suggest refactoring approaches or explain complex code sections\n",
+        ])
         
-        return context
+        return ''.join(parts)
+    
+    def _reset_context_prompt(self):
+        """Drop the cached prompt so it is rebuilt for the current context on demand."""
+        self._context_prompt_str = ''
+        self._context_prompt_bytes = None
+    
+    def _ensure_context_prompt(self):
+        """Build the context prompt on first use and cache it with its UTF-8 encoding."""
+        if self._context_prompt_bytes is not None:
+            return
+        # Contexts saved by older versions carry a prebuilt prompt
+        prompt = self.current_context.get('context_prompt')
+        if prompt is None:
+            prompt = self._create_context_prompt(self.current_context)
+        self._context_prompt_str = prompt
+        self._context_prompt_bytes = prompt.encode('utf-8')
+    
+    def _cached_context_summary(self, context_data: Dict[str, Any]) -> str:
+        """Return the context summary, reusing the last one if the analysis is unchanged."""
+        # Timestamp and project path together identify a saved analysis
+        key = hash((context_data.get('timestamp'), context_data.get('project_path')))
+        if self._summary_cache is not None and self._summary_cache[0] == key:
+            return self._summary_cache[1]
+        summary = self._create_context_summary(context_data)
+        self._summary_cache = (key, summary)
+        return summary
     
     def _create_context_summary(self, context_data: Dict[str, Any]) -> str:
         """Create a brief summary of the analysis context."""
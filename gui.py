@@ -5,7 +5,7 @@ from PySide6.QtWidgets import (
     QScrollArea, QGroupBox, QFrame
 )
 from PySide6.QtGui import QColor, QTextCharFormat, QFont, QSyntaxHighlighter
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer
 from logic import OllamaTypingWorker
 from settings import load_settings, save_settings
 from history import save_history
@@ -277,23 +277,14 @@ class EntitySidebar(QWidget):
                     'methods': cls.get('methods', [])
                 })
 
-            # Add functions (not methods)
-            functions = info.get('functions', [])
-            for func in functions:
-                # Check if this function is a method (inside a class)
-                is_method = False
-                for cls in classes:
-                    if func['name'] in cls.get('methods', []):
-                        is_method = True
-                        break
-
-                if not is_method:
-                    all_functions.append({
-                        'name': func['name'],
-                        'file': file_path,
-                        'line': func.get('line', 1),
-                        'args': func.get('args', [])
-                    })
+            # Add functions (methods are listed under their class)
+            for func in info.get('functions', []):
+                all_functions.append({
+                    'name': func['name'],
+                    'file': file_path,
+                    'line': func.get('line', 1),
+                    'args': func.get('args', [])
+                })
 
         # Display classes section
         if all_classes:
@@ -428,8 +419,18 @@ class ChatTab(QWidget):
 
         self.chat_area = QTextEdit()
         self.chat_area.setReadOnly(True)
+        # Qt drops the oldest blocks past this limit, so long sessions don't slow every insert
+        self.chat_area.document().setMaximumBlockCount(self.settings.get("max_chat_blocks", 5000))
         layout.addWidget(self.chat_area)
 
+        # Streamed text is buffered and inserted at most once per frame (~60 FPS)
+        self._pending_text = []
+        self._pending_chunks = {}  # worker -> chunks buffered from it, to hand back on flush
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(16)
+        self._flush_timer.timeout.connect(self.flush_stream_text)
+
         # Apply syntax highlighter - DISABLED: causes gibberish in AI responses
         # self.highlighter = CodeHighlighter(self.chat_area.document(), language="python")
 
@@ -468,15 +469,40 @@ class ChatTab(QWidget):
         self.scan_btn.clicked.connect(self.select_and_scan_project)
         self.cancel_scan_btn.clicked.connect(self.cancel_scan)
 
-    def append_stream_char(self, c: str):
-        if not c:
+    def append_stream_text(self, text: str):
+        if not text:
+            return
+        self._pending_text.append(text)
+        # Credit the worker that emitted the chunk; tab.worker may already be a newer one
+        worker = self.sender()
+        if worker is not None:
+            self._pending_chunks[worker] = self._pending_chunks.get(worker, 0) + 1
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def on_worker_finished(self):
+        """Finish the streamed response once the worker is done."""
+        self.flush_stream_text()
+        self.chat_area.insertPlainText("\n")
+        self.typing_label.setText("")
+
+    def flush_stream_text(self):
+        """Insert all buffered stream text into the chat area in one edit."""
+        self._flush_timer.stop()
+        if not self._pending_text:
             return
+        text = "".join(self._pending_text)
+        self._pending_text.clear()
         # Ensure we always append at the end and keep the view scrolled
         cursor = self.chat_area.textCursor()
         cursor.movePosition(cursor.MoveOperation.End)
         self.chat_area.setTextCursor(cursor)
-        self.chat_area.insertPlainText(c)
+        self.chat_area.insertPlainText(text)
         self.chat_area.ensureCursorVisible()
+        # Let each worker produce more now that its chunks are on screen
+        pending, self._pending_chunks = self._pending_chunks, {}
+        for worker, count in pending.items():
+            worker.chunk_consumed(count)
 
     def on_model_changed(self, text: str):
         self.model = text.strip() if text.strip() else self.model
@@ -485,7 +511,7 @@ class ChatTab(QWidget):
         # Remember current text to preserve user selection if possible
         current = self.model_combo.currentText().strip()
         ollama_path = self.settings.get("ollama_path", "ollama")
-        models = get_ollama_models(ollama_path)
+        models = get_ollama_models(ollama_path, force=True)
         if not models:
             # Keep existing if none found
             return
@@ -575,6 +601,7 @@ class ChatTab(QWidget):
             self.worker.stop_generation()
             self.stop_btn.setEnabled(False)
             self.send_btn.setEnabled(True)
+            self.flush_stream_text()
             self.chat_area.append("[Generation Stopped]\n")
     
     def edit_file(self):
@@ -1,146 +1,397 @@
+import codecs
+import http.client
+import json
 import subprocess
 import time
 import os
-from PySide6.QtCore import QThread, Signal
-from utils import clean_output
+import queue
+import selectors
+import signal
+import socket
+import threading
+from urllib.parse import urlsplit
+from PySide6.QtCore import QThread, Signal, QTimer
+from utils import clean_output_bytes
+
+# Environment shared by every generation instead of copying os.environ per run;
+# OLLAMA_NO_COLOR reduces ANSI noise when possible
+_BASE_ENV = {**os.environ, "OLLAMA_NO_COLOR": os.environ.get("OLLAMA_NO_COLOR", "1")}
+
+class OllamaHTTPClient:
+    """Keep-alive connections to the Ollama HTTP API, shared by every worker."""
+
+    def __init__(self, host="http://localhost:11434"):
+        url = urlsplit(host)
+        self.hostname = url.hostname or "localhost"
+        self.port = url.port or 11434
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self, fresh=False):
+        """Return an idle connection, or open a new one. Raises OSError if the server is unreachable."""
+        if not fresh:
+            with self._lock:
+                if self._idle:
+                    return self._idle.pop()
+        conn = http.client.HTTPConnection(self.hostname, self.port, timeout=2)
+        try:
+            conn.connect()
+        except OSError:
+            conn.close()
+            raise
+        conn.sock.settimeout(300)  # 5 minutes timeout between chunks
+        return conn
+
+    def release(self, conn, reusable=True):
+        """Hand a connection back for reuse, or close it if its response wasn't fully read."""
+        if reusable and conn.sock is not None:
+            with self._lock:
+                self._idle.append(conn)
+        else:
+            conn.close()
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
 
 class OllamaTypingWorker(QThread):
     stop_requested = Signal()
-    new_char = Signal(str)
+    new_text = Signal(str)
     finished_signal = Signal()
 
-    def __init__(self, model, prompt, ollama_path="ollama"):
+    def __init__(self, model, prompt, ollama_path="ollama", ollama_host="http://localhost:11434", http=None):
         super().__init__()
         self.model = model
         self.prompt = prompt
         self.ollama_path = ollama_path
+        self.ollama_host = ollama_host
+        self.http = http  # shared OllamaHTTPClient, or None for a private one
+        self._http_conn = None
         self.stop_flag = False
         self.process = None
+        self._stop_w = None  # write end of the PTY loop's wakeup pipe
+        self._stop_lock = threading.Lock()
+        self._decoder = None
+        # Streamed chunks the GUI hasn't inserted yet; the producer waits when all are in flight
+        self._backlog = threading.Semaphore(64)
+        self._in_flight = 0  # chunks emitted with a permit that the GUI hasn't confirmed
+        self._in_flight_lock = threading.Lock()
+
+    def chunk_consumed(self, count=1):
+        """Called by the GUI once it has inserted count texts emitted by this worker."""
+        # Status messages ([Error], [Generation Stopped], ...) take no permit and are
+        # always the last texts emitted, so only permits actually taken go back
+        with self._in_flight_lock:
+            count = min(count, self._in_flight)
+            self._in_flight -= count
+        for _ in range(count):
+            self._backlog.release()
+
+    def _emit_chunk(self, text):
+        """Emit a streamed chunk, waiting while the GUI is too far behind."""
+        while not self._backlog.acquire(timeout=0.1):
+            if self.stop_flag:
+                return
+        with self._in_flight_lock:
+            self._in_flight += 1
+        self.new_text.emit(text)
 
     def stop_generation(self):
         """Stop the ongoing generation."""
         self.stop_flag = True
-        if self.process and self.process.poll() is None:
+        with self._stop_lock:
+            if self._stop_w is not None:
+                os.write(self._stop_w, b"\0")
+        conn = self._http_conn
+        if conn is not None and conn.sock is not None:
             try:
-                self.process.terminate()
-                # Give it a moment to terminate gracefully
-                time.sleep(0.1)
-                if self.process.poll() is None:
-                    self.process.kill()
-            except Exception:
+                # Wakes the worker if it is blocked reading the HTTP response
+                conn.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
                 pass
+        if self.process and self.process.poll() is None:
+            self._terminate_process()
+            # Give it a moment to terminate gracefully, without blocking the GUI thread
+            QTimer.singleShot(100, self._kill_process)
+
+    def _signal_process(self, sig):
+        """Send sig to the child's whole process group (just the child on Windows)."""
+        process = self.process
+        if process is None:
+            return
+        try:
+            if os.name == "posix":
+                # The child leads its own session, so this also reaches anything it
+                # spawned, even after the child itself has exited
+                os.killpg(process.pid, sig)
+            elif process.poll() is None:
+                if sig == signal.SIGTERM:
+                    process.terminate()
+                else:
+                    process.kill()
+        except OSError:
+            # ProcessLookupError: nothing is left in the group
+            pass
+
+    def _terminate_process(self):
+        self._signal_process(signal.SIGTERM)
+
+    def _kill_process(self):
+        self._signal_process(getattr(signal, "SIGKILL", signal.SIGTERM))
+
+    def _pipe_pump(self, stream, chunks):
+        """Forward pipe output to the worker loop until EOF, then queue None."""
+        try:
+            while True:
+                # read1 returns as soon as some output is available
+                data = stream.read1(65536)
+                if not data:
+                    break
+                chunks.put(data)
+        except (OSError, ValueError):
+            pass
+        finally:
+            chunks.put(None)
+
+    def _drain_pty(self, master_fd):
+        """Emit everything currently readable from the PTY; return True at EOF."""
+        while True:
+            try:
+                data = os.read(master_fd, 65536)
+            except BlockingIOError:
+                return False
+            except OSError:
+                # EIO: the child closed its side of the terminal
+                return True
+            if not data:
+                return True
+            self._emit_filtered(data)
 
-    def _emit_filtered(self, text: str):
-        cleaned = clean_output(text)
-        for ch in cleaned:
-            self.new_char.emit(ch)
+    def _emit_filtered(self, data: bytes):
+        # Strip terminal noise on the raw bytes, then decode once. The incremental
+        # decoder keeps multi-byte characters split across reads intact.
+        cleaned = self._decoder.decode(clean_output_bytes(data))
+        if cleaned:
+            # One signal per chunk; the GUI inserts the whole chunk at once
+            self._emit_chunk(cleaned)
 
     def run(self):
         try:
-            args = [self.ollama_path, "run", self.model, self.prompt]
-            # Reduce ANSI noise when possible
-            env = os.environ.copy()
-            env.setdefault("OLLAMA_NO_COLOR", "1")
+            # Prefer Ollama's HTTP API and fall back to the CLI when no server is reachable
+            if not self._run_http():
+                self._run_cli()
+            self.finished_signal.emit()
+        except Exception as e:
+            self.new_text.emit(f"[Error] {str(e)}\n")
+            self.finished_signal.emit()
 
-            if os.name == "posix":
-                # Use a pseudo-tty to encourage real-time streaming from Ollama
-                try:
-                    import pty, select
-                    master_fd, slave_fd = pty.openpty()
-                    self.process = subprocess.Popen(
-                        args,
-                        stdout=slave_fd,
-                        stderr=subprocess.STDOUT,
-                        stdin=subprocess.DEVNULL,
-                        env=env,
-                        close_fds=True,
-                    )
-                    process = self.process
-                    os.close(slave_fd)
-                    try:
-                        start_time = time.time()
-                        timeout = 300  # 5 minutes timeout
-                        while True:
-                            # Check for stop request
-                            if self.stop_flag:
-                                self.new_char.emit("\n[Generation Stopped]\n")
-                                process.terminate()
-                                break
-
-                            # Check for timeout
-                            if time.time() - start_time > timeout:
-                                self.new_char.emit(f"\n[Timeout] Response took too long, terminating...\n")
-                                process.terminate()
-                                break
-
-                            # If process exited and no more data, break
-                            if process.poll() is not None:
-                                r, _, _ = select.select([master_fd], [], [], 0)
-                                if not r:
-                                    break
-                            r, _, _ = select.select([master_fd], [], [], 0.05)
-                            if not r:
-                                continue
-                            data = os.read(master_fd, 1024)
-                            if not data:
-                                if process.poll() is not None:
-                                    break
-                                continue
-                            text = data.decode(errors="ignore")
-                            self._emit_filtered(text)
-                    finally:
-                        try:
-                            os.close(master_fd)
-                        except OSError:
-                            pass
-                except Exception:
-                    # Fallback to PIPE below if PTY is unavailable or fails
-                    process = None
-            else:
-                process = None
+    def _run_http(self):
+        """Stream the response from Ollama's HTTP API.
+
+        Returns False without emitting anything if the server can't be reached.
+        """
+        client = self.http or OllamaHTTPClient(self.ollama_host)
+        body = json.dumps({"model": self.model, "prompt": self.prompt, "stream": True})
+        fresh = False
+        while True:
+            try:
+                conn = client.acquire(fresh)
+            except OSError:
+                return False
+            self._http_conn = conn
+            try:
+                conn.request("POST", "/api/generate", body, {"Content-Type": "application/json"})
+                response = conn.getresponse()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                self._http_conn = None
+                conn.close()
+                if self.stop_flag:
+                    self.new_text.emit("\n[Generation Stopped]\n")
+                    return True
+                # An idle keep-alive connection may have been closed by the server
+                # (RemoteDisconnected is a ConnectionError); retry once on a new one
+                if fresh or not isinstance(e, ConnectionError):
+                    raise
+                fresh = True
+
+        reusable = False  # only connections whose response was read to the end go back to the pool
+        try:
+            if response.status != 200:
+                detail = response.read().decode(errors="ignore").strip()
+                reusable = True
+                self.new_text.emit(f"[Error] Ollama returned HTTP {response.status}: {detail}\n")
+                return True
+
+            # The body is newline-delimited JSON, one object per generated chunk
+            deadline = time.time() + 300  # 5 minutes timeout
+            while True:
+                if self.stop_flag:
+                    self.new_text.emit("\n[Generation Stopped]\n")
+                    break
+                if time.time() > deadline:
+                    self.new_text.emit(f"\n[Timeout] Response took too long, terminating...\n")
+                    break
+                line = response.readline()
+                if not line:
+                    if self.stop_flag:
+                        continue  # connection shut down by stop_generation
+                    break
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    self.new_text.emit(f"\n[Error] {chunk['error']}\n")
+                    break
+                if chunk.get("response"):
+                    self._emit_chunk(chunk["response"])
+                if chunk.get("done"):
+                    response.read()  # consume the end of the chunked body so the connection can be reused
+                    reusable = True
+                    break
+        except (OSError, http.client.HTTPException):
+            # stop_generation shuts the socket down to interrupt a blocked read,
+            # which can also surface as a truncated chunked body (IncompleteRead)
+            if not self.stop_flag:
+                raise
+            self.new_text.emit("\n[Generation Stopped]\n")
+        finally:
+            self._http_conn = None
+            client.release(conn, reusable and not self.stop_flag)
+            if client is not self.http:
+                client.close()
+        return True
 
-            if process is None:
-                # Portable fallback: use PIPE with character-by-character reading to enable real-time streaming
+    def _run_cli(self):
+        args = [self.ollama_path, "run", self.model, self.prompt]
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        env = _BASE_ENV
+
+        if os.name == "posix":
+            # Use a pseudo-tty to encourage real-time streaming from Ollama
+            try:
+                import pty
+                master_fd, slave_fd = pty.openpty()
                 self.process = subprocess.Popen(
                     args,
-                    stdout=subprocess.PIPE,
+                    stdout=slave_fd,
                     stderr=subprocess.STDOUT,
-                    text=True,
-                    bufsize=1,  # line-buffered
+                    stdin=subprocess.DEVNULL,
                     env=env,
+                    close_fds=True,
+                    start_new_session=True,
                 )
                 process = self.process
-                # Read character by character to enable real-time streaming
-                start_time = time.time()
-                timeout = 300  # 5 minutes timeout
-                while True:
-                    # Check for stop request
-                    if self.stop_flag:
-                        self.new_char.emit("\n[Generation Stopped]\n")
-                        process.terminate()
-                        break
-
-                    # Check for timeout
-                    if time.time() - start_time > timeout:
-                        self.new_char.emit(f"\n[Timeout] Response took too long, terminating...\n")
-                        process.terminate()
-                        break
-
-                    char = process.stdout.read(1)
-                    if char:
-                        self._emit_filtered(char)
-                    elif process.poll() is not None:
-                        break
-                    else:
-                        time.sleep(0.01)
-                # Ensure process completes
+                os.close(slave_fd)
+                # Self-pipe so stop_generation can wake the blocked selector immediately
+                stop_r, self._stop_w = os.pipe()
+                selector = selectors.DefaultSelector()
+                child_fd = None
                 try:
-                    process.wait(timeout=10)  # Wait up to 10 seconds for process to finish
-                except subprocess.TimeoutExpired:
-                    process.kill()
-                    self.new_char.emit(f"\n[Error] Process did not terminate cleanly\n")
+                    os.set_blocking(master_fd, False)
+                    selector.register(master_fd, selectors.EVENT_READ)
+                    selector.register(stop_r, selectors.EVENT_READ)
+                    # Anything the child leaves running may hold the terminal open after it
+                    # exits, so watch for the exit itself: a pidfd wakes the selector on
+                    # Linux, elsewhere the loop polls the child every 0.1 s
+                    poll_interval = 0.1
+                    if hasattr(os, "pidfd_open"):
+                        try:
+                            child_fd = os.pidfd_open(process.pid)
+                            selector.register(child_fd, selectors.EVENT_READ)
+                            poll_interval = None
+                        except OSError:
+                            child_fd = None
+                    deadline = time.time() + 300  # 5 minutes timeout
+                    eof = False
+                    while True:
+                        # Check for stop request
+                        if self.stop_flag:
+                            self.new_text.emit("\n[Generation Stopped]\n")
+                            self._terminate_process()
+                            break
 
-            self.finished_signal.emit()
-        except Exception as e:
-            self.new_char.emit(f"[Error] {str(e)}\n")
-            self.finished_signal.emit()
+                        # Check for timeout
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            self.new_text.emit(f"\n[Timeout] Response took too long, terminating...\n")
+                            self._terminate_process()
+                            break
+
+                        # Sleep until output arrives, the child exits, a stop is requested, or the timeout expires
+                        timeout = remaining if poll_interval is None else min(remaining, poll_interval)
+                        for key, _ in selector.select(timeout):
+                            if key.fd == master_fd:
+                                eof = self._drain_pty(master_fd)
+                            # stop wakeups are handled at the top of the loop, child exit below
+                        if not eof and process.poll() is not None:
+                            # Collect what the child wrote before exiting, then stop waiting
+                            self._drain_pty(master_fd)
+                            eof = True
+                        if eof and not self.stop_flag:
+                            break
+                finally:
+                    selector.close()
+                    with self._stop_lock:
+                        stop_w, self._stop_w = self._stop_w, None
+                    for fd in (master_fd, stop_r, stop_w, child_fd):
+                        if fd is None:
+                            continue
+                        try:
+                            os.close(fd)
+                        except OSError:
+                            pass
+            except Exception:
+                # Fallback to PIPE below if PTY is unavailable or fails
+                process = None
+        else:
+            process = None
+
+        if process is None:
+            # Portable fallback: use a buffered binary PIPE and stream whatever output is available
+            self.process = subprocess.Popen(
+                args,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                env=env,
+                start_new_session=(os.name == "posix"),
+            )
+            process = self.process
+            # Pipes can't be polled portably (no select on Windows), so a background
+            # thread does the blocking reads and hands chunks over through a queue
+            chunks = queue.Queue()
+            threading.Thread(target=self._pipe_pump, args=(process.stdout, chunks), daemon=True).start()
+            start_time = time.time()
+            timeout = 300  # 5 minutes timeout
+            while True:
+                # Check for stop request
+                if self.stop_flag:
+                    self.new_text.emit("\n[Generation Stopped]\n")
+                    self._terminate_process()
+                    break
+
+                # Check for timeout
+                if time.time() - start_time > timeout:
+                    self.new_text.emit(f"\n[Timeout] Response took too long, terminating...\n")
+                    self._terminate_process()
+                    break
+
+                try:
+                    data = chunks.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if data is None:
+                    if self.stop_flag:
+                        continue  # killed by stop_generation; report it at the top of the loop
+                    # EOF: the process closed its output
+                    break
+                self._emit_filtered(data)
+            # Ensure process completes
+            try:
+                process.wait(timeout=10)  # Wait up to 10 seconds for process to finish
+            except subprocess.TimeoutExpired:
+                self._kill_process()
+                self.new_text.emit(f"\n[Error] Process did not terminate cleanly\n")
@@ -1,9 +1,12 @@
+import multiprocessing
 import sys
+import threading
+from functools import partial
 from PySide6.QtWidgets import QApplication, QMainWindow, QMenuBar, QMenu, QMessageBox, QTabWidget, QWidget, QHBoxLayout
 from settings import load_settings, save_settings
 from history import load_history, save_history
 from gui import ChatTab, SettingsDialog, EntitySidebar
-from logic import OllamaTypingWorker
+from logic import OllamaHTTPClient, OllamaTypingWorker
 from scanner import ProjectAnalyzer
 from analysis_context import context_manager
 from pathlib import Path
@@ -11,6 +14,10 @@ from PySide6.QtWidgets import QFileDialog, QProgressDialog
 from PySide6.QtCore import QThread, Signal, Qt
 from PySide6.QtGui import QKeySequence, QAction
 
+def _nonempty(d):
+    """Iterate over the (key, value) pairs of d whose value is non-empty."""
+    return ((k, v) for k, v in d.items() if v)
+
 class AnalysisWorker(QThread):
     progress = Signal(str)
     finished = Signal(dict)
@@ -19,29 +26,34 @@ class AnalysisWorker(QThread):
     def __init__(self, project_path):
         super().__init__()
         self.project_path = project_path
-        self.cancelled = False
+        self._cancel = threading.Event()
 
     def cancel(self):
         """Cancel the analysis operation."""
-        self.cancelled = True
+        self._cancel.set()
 
     def run(self):
         try:
             analyzer = ProjectAnalyzer(self.project_path)
-            results = analyzer.analyze_project(lambda msg: self.progress.emit(msg))
-            if not self.cancelled:
+            results = analyzer.analyze_project(lambda msg: self.progress.emit(msg), cancel_event=self._cancel)
+            if not self._cancel.is_set():
                 self.finished.emit(results)
         except Exception as e:
-            if not self.cancelled:
+            if not self._cancel.is_set():
                 self.error.emit(str(e))
 
 class ChatApp(QMainWindow):
+    _qss_cache = {}  # font size -> dark theme stylesheet, shared across windows
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Offline ChugaGPT AI Tool")
         self.setGeometry(100, 100, 1000, 700)
 
         self.settings = load_settings()
+        self._last_qss_key = None  # (dark, font_size) of the theme currently applied
+        # One keep-alive connection pool for every tab and prompt
+        self.ollama_http = OllamaHTTPClient(self.settings.get("ollama_host", "http://localhost:11434"))
 
         # Menu
         menu_bar = self.menuBar()
@@ -94,11 +106,27 @@ class ChatApp(QMainWindow):
         self.apply_theme()
 
     def apply_theme(self):
-        # Minimal Warp-like dark theme
-        if not self.settings.get("dark_theme", True):
-            self.setStyleSheet("")
-            return
+        dark = bool(self.settings.get("dark_theme", True))
         font_size = int(self.settings.get("font_size", 14))
+        # Restyling repolishes the whole widget tree, so skip it when nothing changed
+        key = (dark, font_size if dark else None)
+        if key == self._last_qss_key:
+            return
+        self._last_qss_key = key
+
+        if not dark:
+            # Clearing an already empty sheet would still trigger a restyle on startup
+            if self.styleSheet():
+                self.setStyleSheet("")
+            return
+        qss = self._qss_cache.get(font_size)
+        if qss is None:
+            qss = self._qss_cache[font_size] = self._build_dark_qss(font_size)
+        self.setStyleSheet(qss)
+
+    @staticmethod
+    def _build_dark_qss(font_size):
+        # Minimal Warp-like dark theme
         base_bg = "#0b0f14"  # near-black blue
         panel_bg = "#0f141a"
         accent = "#7aa2f7"   # blue accent
@@ -107,7 +135,7 @@ class ChatApp(QMainWindow):
         subtext = "#9aa5ce"
         btn_bg = "#1a2130"
         border = "#1f2a37"
-        qss = f"""
+        return f"""
             QMainWindow {{ background-color: {base_bg}; color: {text_col}; }}
             QWidget {{ color: {text_col}; font-size: {font_size}px; }}
             QTabWidget::pane {{ border: 1px solid {border}; background: {panel_bg}; }}
@@ -131,15 +159,14 @@ class ChatApp(QMainWindow):
             QTabBar::close-button {{ image: url(close.png); }}
             QTabBar::close-button:hover {{ background: {accent}; }}
         """
-        self.setStyleSheet(qss)
 
     def new_chat_tab(self):
         tab = ChatTab(self.settings)
         self.tabs.addTab(tab, f"Chat {self.tabs.count()+1}")
 
-        tab.send_btn.clicked.connect(lambda: self.send_message(tab))
-        tab.input_box.returnPressed.connect(lambda: self.send_message(tab))
-        tab.clear_btn.clicked.connect(lambda: tab.chat_area.clear())
+        tab.send_btn.clicked.connect(partial(self.send_message, tab))
+        tab.input_box.returnPressed.connect(partial(self.send_message, tab))
+        tab.clear_btn.clicked.connect(tab.chat_area.clear)
         tab.stop_btn.clicked.connect(tab.stop_generation)
 
     def send_message(self, tab):
@@ -159,10 +186,11 @@ class ChatApp(QMainWindow):
         # Show model label and start streaming directly under it
         tab.chat_area.append(f"<b style='color:#66d9ef;'>[{tab.model}]</b> ")
         tab.typing_label.setText(f"Typing with {tab.model}...")
-        tab.worker = OllamaTypingWorker(tab.model, prompt, self.settings.get("ollama_path", "ollama"))
-        # Stream characters into the chat area safely
-        tab.worker.new_char.connect(tab.append_stream_char)
-        tab.worker.finished_signal.connect(lambda: (tab.chat_area.insertPlainText("\n"), tab.typing_label.setText("")))
+        tab.worker = OllamaTypingWorker(tab.model, prompt, self.settings.get("ollama_path", "ollama"),
+                                        http=self.ollama_http)
+        # Stream text chunks into the chat area safely
+        tab.worker.new_text.connect(tab.append_stream_text)
+        tab.worker.finished_signal.connect(tab.on_worker_finished)
         tab.worker.start()
         save_history(text, tab.model)
 
@@ -235,9 +263,9 @@ class ChatApp(QMainWindow):
         tab.chat_area.append("\n")
 
         # Connect the tab's buttons
-        tab.send_btn.clicked.connect(lambda: self.send_message(tab))
-        tab.input_box.returnPressed.connect(lambda: self.send_message(tab))
-        tab.clear_btn.clicked.connect(lambda: tab.chat_area.clear())
+        tab.send_btn.clicked.connect(partial(self.send_message, tab))
+        tab.input_box.returnPressed.connect(partial(self.send_message, tab))
+        tab.clear_btn.clicked.connect(tab.chat_area.clear)
         tab.stop_btn.clicked.connect(tab.stop_generation)
 
     def close_tab(self, index):
@@ -265,7 +293,7 @@ class ChatApp(QMainWindow):
         issues = results.get('issues', {})
         suggestions = results.get('suggestions', {})
 
-        prompt = f"""# Project Analysis Results
+        parts = [f"""# Project Analysis Results
 
 ## Project: {Path(project_path).name}
 - **Total Files**: {summary.get('total_files', 0)}
@@ -273,23 +301,19 @@ class ChatApp(QMainWindow):
 - **Issues Found**: {summary.get('issues_count', 0)}
 
 ## Key Issues:
-"""
+"""]
 
         # Add major issues
-        for category, issue_list in issues.items():
-            if issue_list:
-                prompt += f"### {category.replace('_', ' ').title()}\n"
-                for issue in issue_list[:5]:  # Limit to 5 per category
-                    prompt += f"- {issue}\n"
+        for category, issue_list in _nonempty(issues):
+            parts.append(f"### {category.replace('_', ' ').title()}\n")
+            parts.extend(f"- {issue}\n" for issue in issue_list[:5])  # Limit to 5 per category
 
-        prompt += "\n## Current Suggestions:\n"
-        for category, suggestion_list in suggestions.items():
-            if suggestion_list:
-                prompt += f"### {category.title()}\n"
-                for suggestion in suggestion_list:
-                    prompt += f"- {suggestion}\n"
+        parts.append("\n## Current Suggestions:\n")
+        for category, suggestion_list in _nonempty(suggestions):
+            parts.append(f"### {category.title()}\n")
+            parts.extend(f"- {suggestion}\n" for suggestion in suggestion_list)
 
-        prompt += """
+        parts.append("""
 
 ## Task:
 As an expert software engineer, please analyze this project analysis and provide:
@@ -299,9 +323,9 @@ As an expert software engineer, please analyze this project analysis and provide
 4. Best practices recommendations for this type of project
 5. Any potential bugs or security concerns you can identify from the analysis
 
-Please be thorough but practical in your recommendations. Focus on actionable improvements that will have the most impact."""
+Please be thorough but practical in your recommendations. Focus on actionable improvements that will have the most impact.""")
 
-        return prompt
+        return "".join(parts)
 
     def create_analysis_tab(self, prompt, results, project_path):
         """Create a new chat tab with the analysis prompt."""
@@ -311,13 +335,12 @@ Please be thorough but practical in your recommendations. Focus on actionable im
         self.tabs.setCurrentIndex(tab_index)
 
         # Connect the tab's buttons
-        tab.send_btn.clicked.connect(lambda: self.send_message(tab))
-        tab.input_box.returnPressed.connect(lambda: self.send_message(tab))
-        tab.clear_btn.clicked.connect(lambda: tab.chat_area.clear())
+        tab.send_btn.clicked.connect(partial(self.send_message, tab))
+        tab.input_box.returnPressed.connect(partial(self.send_message, tab))
+        tab.clear_btn.clicked.connect(tab.chat_area.clear)
 
         # Display analysis summary first
-        analyzer = ProjectAnalyzer()
-        formatted_results = analyzer.format_analysis_results(results)
+        formatted_results = ProjectAnalyzer.format_analysis_results(results)
 
         tab.chat_area.append("<b style='color:#66d9ef;'>[Project Analysis Complete]</b>\n")
         tab.chat_area.append(formatted_results)
@@ -329,14 +352,17 @@ Please be thorough but practical in your recommendations. Focus on actionable im
         tab.typing_label.setText(f"Analyzing with {tab.model}...")
 
         # Create worker for AI analysis
-        tab.worker = OllamaTypingWorker(tab.model, prompt, self.settings.get("ollama_path", "ollama"))
-        tab.worker.new_char.connect(tab.append_stream_char)
-        tab.worker.finished_signal.connect(lambda: (tab.chat_area.insertPlainText("\n"), tab.typing_label.setText("")))
+        tab.worker = OllamaTypingWorker(tab.model, prompt, self.settings.get("ollama_path", "ollama"),
+                                        http=self.ollama_http)
+        tab.worker.new_text.connect(tab.append_stream_text)
+        tab.worker.finished_signal.connect(tab.on_worker_finished)
         tab.worker.start()
 
         save_history(prompt, tab.model)
 
 if __name__ == "__main__":
+    # Lets frozen builds start the analyzer's worker processes
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     window = ChatApp()
     window.show()
@@ -1,13 +1,183 @@
 import os
 import ast
+import hashlib
+import pickle
+import re
+import sys
+import time
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Callable
+from typing import Dict, List, Any, Optional, Callable, Iterable, Iterator, Tuple
 import threading
+import multiprocessing
+from collections import deque
+from itertools import chain, islice
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+# Parsed Python file analyses, one entry per file keyed by its absolute path.
+# Entries record the mtime and size they were made for, so an edited file's
+# new analysis replaces the old one. Loading an entry unpickles it, so the cache
+# lives in the user's cache directory, never in a project or the working
+# directory. Bump the version whenever the shape of the analysis dict changes.
+_AST_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "chugagpt" / "ast"
+_AST_CACHE_VERSION = 4
+
+_TYPE_MAP = {
+    '.py': 'Python',
+    '.json': 'JSON',
+    '.txt': 'Text',
+    '.md': 'Markdown',
+    '.html': 'HTML',
+    '.css': 'CSS',
+    '.js': 'JavaScript',
+    '.ts': 'TypeScript',
+    '.cpp': 'C++',
+    '.c': 'C',
+    '.java': 'Java'
+}
+
+# Path keywords that put a file in an architecture category, highest priority first
+_CATEGORY_KEYWORDS = (
+    ('main_modules', ('main', 'app')),
+    ('utils_modules', ('util', 'helper')),
+    ('test_files', ('test', 'spec')),
+    ('config_files', ('config', 'settings')),
+)
+_KEYWORD_RANK = {keyword: rank for rank, (_, keywords) in enumerate(_CATEGORY_KEYWORDS) for keyword in keywords}
+# A lookahead finds every keyword, including overlapping ones, in a single scan
+_CATEGORY_RE = re.compile('(?=(' + '|'.join(_KEYWORD_RANK) + '))')
+
+# Extensions whose content is never text; their previews skip opening the file
+_BINARY_EXTENSIONS = frozenset({
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp',
+    '.pdf', '.zip', '.gz', '.tar', '.7z', '.jar', '.whl',
+    '.so', '.dll', '.dylib', '.exe', '.bin', '.o', '.a', '.pyc', '.class',
+    '.mp3', '.mp4', '.wav', '.ttf', '.woff', '.woff2'
+})
+
+# Word runs in Python source; used to check which imported names are referenced
+_IDENTIFIER_RE = re.compile(r'\w+')
+_IDENTIFIER_BYTES_RE = re.compile(rb'\w+')  # for ASCII sources, where it matches the same runs
+
+def _decode_text(raw: bytes, complete: bool = True, errors: str = 'strict') -> str:
+    """Decode UTF-8 file bytes, translating newlines the way text-mode reads do.
+    
+    If complete is false, raw was cut off at a size limit and a multi-byte
+    character split by the cut is dropped instead of failing the decode.
+    """
+    try:
+        content = raw.decode('utf-8', errors)
+    except UnicodeDecodeError as e:
+        if complete or e.reason != 'unexpected end of data':
+            raise
+        content = raw[:e.start].decode('utf-8', errors)
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return content
+
+def _read_preview(file_path: Path, max_chars: int) -> str:
+    """Read the first max_chars characters of a UTF-8 file, or a placeholder for binary files."""
+    if file_path.suffix.lower() in _BINARY_EXTENSIONS:
+        return "[Binary or unreadable file]"
+    # Read raw bytes rather than going through a text wrapper; a UTF-8 character
+    # is at most 4 bytes, so this is enough for max_chars characters
+    limit = max_chars * 4
+    try:
+        with open(file_path, 'rb') as f:
+            raw = f.read(limit)
+        content = _decode_text(raw, complete=len(raw) < limit)
+    except (OSError, UnicodeDecodeError):
+        return "[Binary or unreadable file]"
+    content = content[:max_chars]
+    return content + '...' if len(content) == max_chars else content
+
+def _source_preview(source: bytes, max_chars: int = 500) -> str:
+    """Return the first max_chars characters of Python source, decoding only that much."""
+    limit = max_chars * 4
+    complete = len(source) <= limit
+    try:
+        content = _decode_text(source[:limit], complete)
+    except UnicodeDecodeError:
+        # Not UTF-8, but ast.parse accepted it under its declared encoding
+        content = _decode_text(source[:limit], complete, errors='replace')
+    if not complete or len(content) > max_chars:
+        return content[:max_chars] + '...'
+    return content
+
+def _count_lines(source: bytes) -> int:
+    """Count the lines in source without decoding it or splitting it into a list."""
+    lines = source.count(b'\n')
+    if b'\r' in source:
+        # Text-mode reads treat a lone '\r' as a line break too
+        lines += source.count(b'\r') - source.count(b'\r\n')
+    return lines + (1 if source and not source.endswith((b'\n', b'\r')) else 0)
+
+def _used_identifiers(source: bytes) -> set:
+    """Return the word runs in Python source, decoding it only if it isn't plain ASCII."""
+    if source.isascii():
+        return {word.decode('ascii') for word in set(_IDENTIFIER_BYTES_RE.findall(source))}
+    return set(_IDENTIFIER_RE.findall(source.decode('utf-8', 'replace')))
+
+# ProjectScanner reads files on a thread pool, at most _IO_WINDOW files ahead of the parser
+_IO_WORKERS = 8
+_IO_WINDOW = 64
+
+# Spawned workers re-import main.py, and with it Qt and the GUI modules, before
+# analyzing anything. That is a few hundred ms of CPU and tens of MB per worker,
+# against roughly 1-3 ms per file parsed serially, so the pool only pays off on
+# large projects and is kept small.
+_PARALLEL_MIN_FILES = 500
+_MAX_ANALYSIS_WORKERS = 4
+
+# Per-file progress goes out every _PROGRESS_EVERY files or _PROGRESS_INTERVAL seconds
+_PROGRESS_EVERY = 32
+_PROGRESS_INTERVAL = 0.05
+
+class _ProgressThrottle:
+    """Decides which per-file progress updates are worth sending to the GUI."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.last_report = time.monotonic()
+
+    def due(self, i: int) -> bool:
+        """Return True if the update for the i-th file (0-based) should be reported."""
+        now = time.monotonic()
+        if i % _PROGRESS_EVERY == 0 or i + 1 == self.total or now - self.last_report > _PROGRESS_INTERVAL:
+            self.last_report = now
+            return True
+        return False
+
+def _walk_files(root: Path, exclude_dirs: set) -> Iterator[Tuple[str, os.DirEntry]]:
+    """Yield (relative path, DirEntry) for every file under root, in os.walk order."""
+    # scandir reports each entry's type along with its name, so unlike os.walk
+    # nothing here has to stat an entry just to find out whether it's a directory
+    stack = [(os.fspath(root), '')]
+    while stack:
+        dir_path, prefix = stack.pop()
+        subdirs = []
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        # Like os.walk, symlinked directories are neither listed nor followed
+                        if entry.name not in exclude_dirs and not entry.is_symlink():
+                            subdirs.append(entry)
+                    else:
+                        yield prefix + entry.name, entry
+        except OSError:
+            continue
+        # Reversed so the first subdirectory is walked next
+        for entry in reversed(subdirs):
+            stack.append((entry.path, prefix + entry.name + os.sep))
 
 class ProjectScanner:
     def __init__(self, root_path: str = "."):
         self.root_path = Path(root_path)
-        self.exclude_dirs = {'.git', '__pycache__', '.venv', 'node_modules', '.idea', 'build', 'dist'}
+        self.exclude_dirs = {'.git', '__pycache__', '.venv', 'node_modules', '.idea', 'build', 'dist', '.chugagpt_cache'}
         self.cancel_event = threading.Event()
         self.progress_callback: Optional[Callable[[str], None]] = None
 
@@ -17,17 +187,27 @@ class ProjectScanner:
         self.progress_callback = progress_callback
 
         files_info = {}
-        files = self._get_files()
+        files = list(self._get_files())
+        total = len(files)
+        throttle = _ProgressThrottle(total)
 
-        for i, file_path in enumerate(files):
-            if self.cancel_event.is_set():
-                break
+        # Stat and read on the pool, where file I/O releases the GIL, while this
+        # thread parses files in order as their reads complete
+        with ThreadPoolExecutor(max_workers=_IO_WORKERS) as io_pool:
+            reads = deque(io_pool.submit(self._read_file, entry) for _, entry in files[:_IO_WINDOW])
+            for i, (rel_path, entry) in enumerate(files):
+                if self.cancel_event.is_set():
+                    for future in reads:
+                        future.cancel()
+                    break
 
-            if self.progress_callback:
-                self.progress_callback(f"Scanning {file_path.name}... ({i+1}/{len(files)})")
+                if self.progress_callback and throttle.due(i):
+                    self.progress_callback(f"Scanning {entry.name}... ({i+1}/{total})")
 
-            rel_path = file_path.relative_to(self.root_path)
-            files_info[str(rel_path)] = self._analyze_file(file_path)
+                st, content = reads.popleft().result()
+                if i + _IO_WINDOW < total:
+                    reads.append(io_pool.submit(self._read_file, files[i + _IO_WINDOW][1]))
+                files_info[rel_path] = self._analyze_file(entry, st, content)
 
         if self.progress_callback:
             if self.cancel_event.is_set():
@@ -41,66 +221,61 @@ class ProjectScanner:
         """Cancel the ongoing scan operation."""
         self.cancel_event.set()
 
-    def _get_files(self) -> List[Path]:
+    def _get_files(self) -> Iterator[Tuple[str, os.DirEntry]]:
         """Get all files in the project, excluding certain directories."""
-        files = []
-        for root, dirs, filenames in os.walk(self.root_path):
-            # Remove excluded directories
-            dirs[:] = [d for d in dirs if d not in self.exclude_dirs]
-            for filename in filenames:
-                files.append(Path(root) / filename)
-        return files
-
-    def _analyze_file(self, file_path: Path) -> Dict[str, Any]:
-        """Analyze a single file and return information."""
+        return _walk_files(self.root_path, self.exclude_dirs)
+
+    def _read_file(self, entry: os.DirEntry) -> Tuple[os.stat_result, Any]:
+        """Stat and read a file ahead of analysis; runs on the I/O pool."""
+        st = entry.stat()
+        file_path = Path(entry.path)
+        if file_path.suffix.lower() != '.py':
+            return st, self._get_content_preview(file_path)
+        try:
+            with open(file_path, 'rb') as f:
+                return st, f.read()
+        except Exception as e:
+            return st, e  # reported by _analyze_python_file
+
+    def _analyze_file(self, entry: os.DirEntry, st: os.stat_result, content: Any) -> Dict[str, Any]:
+        """Analyze a single file from what _read_file loaded and return information."""
+        file_path = Path(entry.path)
+        suffix = file_path.suffix
+        ext = suffix.lower()
         info = {
-            'size': file_path.stat().st_size,
-            'extension': file_path.suffix,
-            'type': self._get_file_type(file_path)
+            'size': st.st_size,
+            'extension': suffix,
+            'type': self._get_file_type(ext)
         }
 
-        if file_path.suffix == '.py':
-            info.update(self._analyze_python_file(file_path))
+        if ext == '.py':
+            info.update(self._analyze_python_file(file_path, content))
         else:
-            info['content_preview'] = self._get_content_preview(file_path)
+            info['content_preview'] = content
 
         return info
 
-    def _get_file_type(self, file_path: Path) -> str:
-        """Determine file type based on extension."""
-        ext = file_path.suffix.lower()
-        type_map = {
-            '.py': 'Python',
-            '.json': 'JSON',
-            '.txt': 'Text',
-            '.md': 'Markdown',
-            '.html': 'HTML',
-            '.css': 'CSS',
-            '.js': 'JavaScript',
-            '.ts': 'TypeScript',
-            '.cpp': 'C++',
-            '.c': 'C',
-            '.java': 'Java'
-        }
-        return type_map.get(ext, 'Unknown')
+    def _get_file_type(self, ext: str) -> str:
+        """Determine file type from a lowercased extension."""
+        return _TYPE_MAP.get(ext, 'Unknown')
 
-    def _analyze_python_file(self, file_path: Path) -> Dict[str, Any]:
-        """Analyze Python file using AST."""
+    def _analyze_python_file(self, file_path: Path, source: Any) -> Dict[str, Any]:
+        """Analyze Python source bytes using AST; source is the exception if reading failed."""
+        if isinstance(source, Exception):
+            return {'error': str(source)}
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            tree = ast.parse(content, filename=str(file_path))
+            tree = ast.parse(source, filename=str(file_path))
 
             analysis = {
                 'classes': [],
                 'functions': [],
                 'imports': [],
-                'line_count': len(content.splitlines()),
-                'content_preview': content[:500] + '...' if len(content) > 500 else content
+                'line_count': _count_lines(source),
+                'content_preview': _source_preview(source)
             }
 
-            for node in ast.walk(tree):
+            # Only module-level classes and functions; methods are listed under their class
+            for node in ast.iter_child_nodes(tree):
                 if isinstance(node, ast.ClassDef):
                     analysis['classes'].append({
                         'name': node.name,
@@ -113,7 +288,10 @@ class ProjectScanner:
                         'line': node.lineno,
                         'args': [arg.arg for arg in node.args.args]
                     })
-                elif isinstance(node, ast.Import):
+
+            # Imports anywhere count, e.g. the ones guarded by try/except ImportError
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Import):
                     analysis['imports'].extend([alias.name for alias in node.names])
                 elif isinstance(node, ast.ImportFrom):
                     module = node.module or ''
@@ -125,90 +303,174 @@ class ProjectScanner:
 
     def _get_content_preview(self, file_path: Path, max_chars: int = 200) -> str:
         """Get a preview of file content."""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read(max_chars)
-                return content + '...' if len(content) == max_chars else content
-        except:
-            return "[Binary or unreadable file]"
+        return _read_preview(file_path, max_chars)
 
 def format_scan_results(scan_results: Dict[str, Any]) -> str:
     """Format scan results for display."""
-    output = "Project Scan Results:\n\n"
+    parts = ["Project Scan Results:\n\n"]
 
     for file_path, info in scan_results.items():
-        output += f"📄 {file_path}\n"
-        output += f"   Type: {info.get('type', 'Unknown')}\n"
-        output += f"   Size: {info['size']} bytes\n"
+        parts.append(f"📄 {file_path}\n"
+                     f"   Type: {info.get('type', 'Unknown')}\n"
+                     f"   Size: {info['size']} bytes\n")
 
         if 'classes' in info:
             if info['classes']:
-                output += f"   Classes: {', '.join([c['name'] for c in info['classes']])}\n"
+                class_names = ', '.join([c['name'] for c in info['classes']])
+                parts.append(f"   Classes: {class_names}\n")
             if info['functions']:
-                output += f"   Functions: {', '.join([f['name'] for f in info['functions']])}\n"
-            if info['imports']:
-                output += f"   Imports: {', '.join(info['imports'][:5])}{'...' if len(info['imports']) > 5 else ''}\n"
-            output += f"   Lines: {info.get('line_count', 0)}\n"
+                function_names = ', '.join([f['name'] for f in info['functions']])
+                parts.append(f"   Functions: {function_names}\n")
+            imports = info['imports']
+            if imports:
+                parts.append(f"   Imports: {', '.join(imports[:5])}{'...' if len(imports) > 5 else ''}\n")
+            parts.append(f"   Lines: {info.get('line_count', 0)}\n")
+
+        parts.append("\n")
 
-        output += "\n"
+    return "".join(parts)
+
+class _AnalysisVisitor(ast.NodeVisitor):
+    """Collect classes, functions, imports, complexity and docstring counts in one traversal."""
+    
+    def __init__(self):
+        # Only module-level classes and functions are listed; methods appear under
+        # their class. Imports are recorded with their depth in the tree so
+        # ordered() can return them in the breadth-first order ast.walk produced.
+        self.classes = []
+        self.functions = []
+        self.imports = []
+        self.complexity = 1  # Base complexity
+        self.docstrings = {'functions': 0, 'classes': 0, 'total_functions': 0, 'total_classes': 0}
+        self._depth = 0
+        self._branches = 0  # branch statements seen so far, for per-function complexity
+    
+    @staticmethod
+    def ordered(items: List[tuple]) -> List[Any]:
+        """Return recorded items in ast.walk order (a stable sort by depth)."""
+        return [item for _, item in sorted(items, key=lambda pair: pair[0])]
+    
+    def generic_visit(self, node: ast.AST):
+        self._depth += 1
+        super().generic_visit(node)
+        self._depth -= 1
+    
+    def visit_ClassDef(self, node: ast.ClassDef):
+        if self._depth == 1:
+            self.classes.append({
+                'name': node.name,
+                'line': node.lineno,
+                'methods': [n.name for n in node.body if isinstance(n, ast.FunctionDef)],
+                'bases': [base.id if hasattr(base, 'id') else str(base) for base in node.bases]
+            })
+        self.docstrings['total_classes'] += 1
+        if ast.get_docstring(node):
+            self.docstrings['classes'] += 1
+        self.generic_visit(node)
+    
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        info = {
+            'name': node.name,
+            'line': node.lineno,
+            'args': [arg.arg for arg in node.args.args],
+            'complexity': 1
+        }
+        if self._depth == 1:
+            self.functions.append(info)
+        self.docstrings['total_functions'] += 1
+        if ast.get_docstring(node):
+            self.docstrings['functions'] += 1
+        branches_before = self._branches
+        self.generic_visit(node)
+        # Branches anywhere inside the function, nested functions included
+        info['complexity'] += self._branches - branches_before
+    
+    def visit_Import(self, node: ast.Import):
+        self.imports.append((self._depth, [alias.name for alias in node.names]))
+    
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        module = node.module or ''
+        self.imports.append((self._depth, [f"{module}.{alias.name}" if module else alias.name for alias in node.names]))
+    
+    def _visit_branch(self, node: ast.AST):
+        self.complexity += 1
+        self._branches += 1
+        self.generic_visit(node)
+    
+    visit_If = visit_For = visit_While = visit_Try = _visit_branch
+    
+    def visit_BoolOp(self, node: ast.BoolOp):
+        if isinstance(node.op, ast.And):
+            self.complexity += len(node.values) - 1
+        self.generic_visit(node)
 
-    return output
+def _analyze_file_worker(path: str) -> Dict[str, Any]:
+    """Process pool entry point for ProjectAnalyzer file analysis."""
+    # Stat here rather than while walking, so the walk never waits on it
+    return ProjectAnalyzer._analyze_path(path, os.stat(path))
 
 class ProjectAnalyzer:
     """Advanced project analyzer with architecture analysis, issue detection, and improvement suggestions."""
     
     def __init__(self, root_path: str = "."):
         self.root_path = Path(root_path)
-        self.exclude_dirs = {'.git', '__pycache__', '.venv', 'node_modules', '.idea', 'build', 'dist', '__pycache__'}
+        self.exclude_dirs = {'.git', '__pycache__', '.venv', 'node_modules', '.idea', 'build', 'dist', '.chugagpt_cache'}
         self.cancel_event = threading.Event()
         self.progress_callback: Optional[Callable[[str], None]] = None
         
-    def analyze_project(self, progress_callback: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
-        """Perform comprehensive project analysis."""
-        self.cancel_event.clear()
+    def analyze_project(self, progress_callback: Optional[Callable[[str], None]] = None,
+                        cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """Perform comprehensive project analysis. Returns an empty dict if cancelled."""
+        if cancel_event is not None:
+            # Share the caller's event so it can stop the analysis mid-walk
+            self.cancel_event = cancel_event
+        else:
+            self.cancel_event.clear()
         self.progress_callback = progress_callback
         
         if self.progress_callback:
             self.progress_callback("Starting project analysis...")
         
-        # Get all files
-        files = self._get_files()
+        # Walk just far enough to tell whether worker processes are worth starting
+        walk = self._get_files()
+        files = list(islice(walk, _PARALLEL_MIN_FILES))
         
         # Basic file analysis
-        file_analysis = {}
-        for i, file_path in enumerate(files):
-            if self.cancel_event.is_set():
-                break
+        if len(files) < _PARALLEL_MIN_FILES:
+            file_analysis = {}
+            total = len(files)
+            throttle = _ProgressThrottle(total)
+            for i, (rel_path, entry) in enumerate(files):
+                if self.cancel_event.is_set():
+                    break
+                if self.progress_callback and throttle.due(i):
+                    self.progress_callback(f"Analyzing {entry.name}... ({i+1}/{total})")
+                file_analysis[rel_path] = self._analyze_file(entry)
+        else:
+            file_analysis = self._analyze_files_parallel(chain(files, walk))
+        
+        if self.cancel_event.is_set():
             if self.progress_callback:
-                self.progress_callback(f"Analyzing {file_path.name}... ({i+1}/{len(files)})")
-            rel_path = file_path.relative_to(self.root_path)
-            file_analysis[str(rel_path)] = self._analyze_file(file_path)
+                self.progress_callback("Analysis cancelled")
+            return {}
         
         # Architecture analysis
         if self.progress_callback:
             self.progress_callback("Analyzing project architecture...")
         architecture = self._analyze_architecture(file_analysis)
         
-        # Issue detection
+        # Issue detection and file-specific feedback
         if self.progress_callback:
-            self.progress_callback("Detecting potential issues...")
-        issues = self._detect_issues(file_analysis)
+            self.progress_callback("Detecting potential issues and creating file-specific feedback...")
+        issues, file_feedback = self._detect_issues_and_feedback(file_analysis)
         
         # Improvement suggestions
         if self.progress_callback:
             self.progress_callback("Generating improvement suggestions...")
         suggestions = self._generate_suggestions(file_analysis, architecture, issues)
         
-        # File-specific feedback
         if self.progress_callback:
-            self.progress_callback("Creating file-specific feedback...")
-        file_feedback = self._generate_file_feedback(file_analysis)
-        
-        if self.progress_callback:
-            if self.cancel_event.is_set():
-                self.progress_callback("Analysis cancelled")
-            else:
-                self.progress_callback("Analysis completed")
+            self.progress_callback("Analysis completed")
         
         return {
             'file_analysis': file_analysis,
@@ -223,153 +485,146 @@ class ProjectAnalyzer:
         """Cancel the ongoing analysis operation."""
         self.cancel_event.set()
     
-    def _get_files(self) -> List[Path]:
+    def _get_files(self) -> Iterator[Tuple[str, os.DirEntry]]:
         """Get all files in the project, excluding certain directories."""
+        return _walk_files(self.root_path, self.exclude_dirs)
+    
+    def _analyze_files_parallel(self, walk: Iterable[Tuple[str, os.DirEntry]]) -> Dict[str, Any]:
+        """Analyze files across worker processes, keeping the results in walk order."""
         files = []
-        for root, dirs, filenames in os.walk(self.root_path):
-            dirs[:] = [d for d in dirs if d not in self.exclude_dirs]
-            for filename in filenames:
-                files.append(Path(root) / filename)
-        return files
+        futures = {}
+        # Spawned rather than forked: forking the multi-threaded GUI process is unsafe
+        executor = ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, _MAX_ANALYSIS_WORKERS), mp_context=multiprocessing.get_context('spawn'))
+        try:
+            # Submit while walking so the workers start before the walk has finished
+            for i, (rel_path, entry) in enumerate(walk):
+                if self.cancel_event.is_set():
+                    break
+                files.append((rel_path, entry))
+                futures[executor.submit(_analyze_file_worker, entry.path)] = i
+            total = len(files)
+            results = [None] * total
+            throttle = _ProgressThrottle(total)
+            for done, future in enumerate(as_completed(futures), 1):
+                if self.cancel_event.is_set():
+                    break
+                i = futures[future]
+                results[i] = future.result()
+                if self.progress_callback and throttle.due(done - 1):
+                    self.progress_callback(f"Analyzing {files[i][1].name}... ({done}/{total})")
+        finally:
+            # Drops files that haven't started yet if we stopped early
+            executor.shutdown(cancel_futures=True)
+        return {rel_path: info for (rel_path, _), info in zip(files, results) if info is not None}
     
-    def _analyze_file(self, file_path: Path) -> Dict[str, Any]:
+    def _analyze_file(self, entry: os.DirEntry) -> Dict[str, Any]:
         """Analyze a single file and return information."""
+        return self._analyze_path(entry.path, entry.stat())
+    
+    @staticmethod
+    def _analyze_path(path: str, st: os.stat_result) -> Dict[str, Any]:
+        """Analyze the file at path, whose stat result is st."""
+        file_path = Path(path)
+        suffix = file_path.suffix
+        ext = suffix.lower()
         info = {
-            'size': file_path.stat().st_size,
-            'extension': file_path.suffix,
-            'type': self._get_file_type(file_path)
+            'size': st.st_size,
+            'extension': suffix,
+            'type': ProjectAnalyzer._get_file_type(ext)
         }
         
-        if file_path.suffix == '.py':
-            info.update(self._analyze_python_file(file_path))
+        if ext == '.py':
+            info.update(ProjectAnalyzer._analyze_python_file(file_path, st))
         else:
-            info['content_preview'] = self._get_content_preview(file_path)
+            info['content_preview'] = ProjectAnalyzer._get_content_preview(file_path)
         
         return info
     
-    def _get_file_type(self, file_path: Path) -> str:
-        """Determine file type based on extension."""
-        ext = file_path.suffix.lower()
-        type_map = {
-            '.py': 'Python',
-            '.json': 'JSON',
-            '.txt': 'Text',
-            '.md': 'Markdown',
-            '.html': 'HTML',
-            '.css': 'CSS',
-            '.js': 'JavaScript',
-            '.ts': 'TypeScript',
-            '.cpp': 'C++',
-            '.c': 'C',
-            '.java': 'Java'
-        }
-        return type_map.get(ext, 'Unknown')
+    @staticmethod
+    def _get_file_type(ext: str) -> str:
+        """Determine file type from a lowercased extension."""
+        return _TYPE_MAP.get(ext, 'Unknown')
     
-    def _analyze_python_file(self, file_path: Path) -> Dict[str, Any]:
+    @staticmethod
+    def _analyze_python_file(file_path: Path, st: Optional[os.stat_result] = None) -> Dict[str, Any]:
         """Analyze Python file using AST."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            if st is None:
+                st = file_path.stat()
+            cache_key = hashlib.blake2b(os.path.abspath(file_path).encode()).hexdigest()
+            cached = ProjectAnalyzer._load_cached_analysis(cache_key, st)
+            if cached is not None:
+                return cached
+            
+            with open(file_path, 'rb') as f:
+                source = f.read()
             
-            tree = ast.parse(content, filename=str(file_path))
+            # Parsing bytes lets the parser honour encoding declarations itself,
+            # and ASCII files (most of them) are never decoded into one big str
+            tree = ast.parse(source, filename=str(file_path))
+            visitor = _AnalysisVisitor()
+            visitor.visit(tree)
+            imports = [name for names in visitor.ordered(visitor.imports) for name in names]
             
             analysis = {
-                'classes': [],
-                'functions': [],
-                'imports': [],
-                'line_count': len(content.splitlines()),
-                'content_preview': content[:500] + '...' if len(content) > 500 else content,
-                'complexity': self._calculate_complexity(tree),
-                'docstrings': self._check_docstrings(tree),
-                'unused_imports': self._detect_unused_imports(content, tree)
+                'classes': visitor.classes,
+                'functions': visitor.functions,
+                'imports': imports,
+                'line_count': _count_lines(source),
+                'content_preview': _source_preview(source),
+                'complexity': visitor.complexity,
+                'docstrings': visitor.docstrings,
+                'unused_imports': ProjectAnalyzer._detect_unused_imports(imports, _used_identifiers(source))
             }
             
-            for node in ast.walk(tree):
-                if isinstance(node, ast.ClassDef):
-                    analysis['classes'].append({
-                        'name': node.name,
-                        'line': node.lineno,
-                        'methods': [n.name for n in node.body if isinstance(n, ast.FunctionDef)],
-                        'bases': [base.id if hasattr(base, 'id') else str(base) for base in node.bases]
-                    })
-                elif isinstance(node, ast.FunctionDef):
-                    analysis['functions'].append({
-                        'name': node.name,
-                        'line': node.lineno,
-                        'args': [arg.arg for arg in node.args.args],
-                        'complexity': self._calculate_function_complexity(node)
-                    })
-                elif isinstance(node, ast.Import):
-                    analysis['imports'].extend([alias.name for alias in node.names])
-                elif isinstance(node, ast.ImportFrom):
-                    module = node.module or ''
-                    analysis['imports'].extend([f"{module}.{alias.name}" if module else alias.name for alias in node.names])
-            
+            ProjectAnalyzer._store_cached_analysis(cache_key, st, analysis)
             return analysis
         except Exception as e:
             return {'error': str(e)}
     
-    def _calculate_complexity(self, tree: ast.AST) -> int:
-        """Calculate cyclomatic complexity of the file."""
-        complexity = 1  # Base complexity
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.If, ast.For, ast.While, ast.Try)):
-                complexity += 1
-            elif isinstance(node, ast.BoolOp) and isinstance(node.op, ast.And):
-                complexity += len(node.values) - 1
-        return complexity
-    
-    def _calculate_function_complexity(self, func_node: ast.FunctionDef) -> int:
-        """Calculate complexity of a single function."""
-        complexity = 1
-        for node in ast.walk(func_node):
-            if isinstance(node, (ast.If, ast.For, ast.While, ast.Try)):
-                complexity += 1
-        return complexity
+    @staticmethod
+    def _load_cached_analysis(cache_key: str, st: os.stat_result) -> Optional[Dict[str, Any]]:
+        """Return the cached analysis for cache_key, or None if missing or stale for st."""
+        try:
+            with open(_AST_CACHE_DIR / f"{cache_key}.pkl", 'rb') as f:
+                version, python_version, mtime_ns, size, analysis = pickle.load(f)
+        except Exception:
+            return None
+        if (version != _AST_CACHE_VERSION or python_version != sys.version_info[:2]
+                or mtime_ns != st.st_mtime_ns or size != st.st_size):
+            return None
+        return analysis
     
-    def _check_docstrings(self, tree: ast.AST) -> Dict[str, int]:
-        """Check if functions and classes have docstrings."""
-        docstrings = {'functions': 0, 'classes': 0, 'total_functions': 0, 'total_classes': 0}
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                docstrings['total_functions'] += 1
-                if ast.get_docstring(node):
-                    docstrings['functions'] += 1
-            elif isinstance(node, ast.ClassDef):
-                docstrings['total_classes'] += 1
-                if ast.get_docstring(node):
-                    docstrings['classes'] += 1
-        
-        return docstrings
+    @staticmethod
+    def _store_cached_analysis(cache_key: str, st: os.stat_result, analysis: Dict[str, Any]):
+        """Persist an analysis to the AST cache; failures only cost a re-parse next time."""
+        try:
+            _AST_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            path = _AST_CACHE_DIR / f"{cache_key}.pkl"
+            tmp_path = path.with_suffix('.tmp')
+            with open(tmp_path, 'wb') as f:
+                pickle.dump((_AST_CACHE_VERSION, sys.version_info[:2], st.st_mtime_ns, st.st_size, analysis), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
     
-    def _detect_unused_imports(self, content: str, tree: ast.AST) -> List[str]:
+    @staticmethod
+    def _detect_unused_imports(imports: List[str], used: set) -> List[str]:
         """Detect potentially unused imports."""
-        imports = []
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Import):
-                imports.extend([alias.name for alias in node.names])
-            elif isinstance(node, ast.ImportFrom):
-                module = node.module or ''
-                imports.extend([f"{module}.{alias.name}" if module else alias.name for alias in node.names])
-        
-        # Simple heuristic: check if import names appear in the content
+        # Simple heuristic: check if import names appear among the file's identifiers.
+        # Star imports name nothing specific, so they are never reported.
         unused = []
         for imp in imports:
             base_name = imp.split('.')[-1]
-            if base_name not in content:
+            if base_name != '*' and base_name not in used:
                 unused.append(imp)
         
         return unused
     
-    def _get_content_preview(self, file_path: Path, max_chars: int = 200) -> str:
+    @staticmethod
+    def _get_content_preview(file_path: Path, max_chars: int = 200) -> str:
         """Get a preview of file content."""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read(max_chars)
-                return content + '...' if len(content) == max_chars else content
-        except:
-            return "[Binary or unreadable file]"
+        return _read_preview(file_path, max_chars)
     
     def _analyze_architecture(self, file_analysis: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze the overall project architecture."""
@@ -390,15 +645,10 @@ class ProjectAnalyzer:
             lang = info.get('type', 'Unknown')
             architecture['languages'][lang] = architecture['languages'].get(lang, 0) + 1
             
-            # Categorize files
-            if 'main' in file_path.lower() or 'app' in file_path.lower():
-                architecture['main_modules'].append(file_path)
-            elif 'util' in file_path.lower() or 'helper' in file_path.lower():
-                architecture['utils_modules'].append(file_path)
-            elif 'test' in file_path.lower() or 'spec' in file_path.lower():
-                architecture['test_files'].append(file_path)
-            elif 'config' in file_path.lower() or 'settings' in file_path.lower():
-                architecture['config_files'].append(file_path)
+            # Categorize files by the highest-priority keyword in the path
+            ranks = [_KEYWORD_RANK[m.group(1)] for m in _CATEGORY_RE.finditer(file_path.lower())]
+            if ranks:
+                architecture[_CATEGORY_KEYWORDS[min(ranks)][0]].append(file_path)
             
             # Statistics
             total_size += info.get('size', 0)
@@ -410,8 +660,8 @@ class ProjectAnalyzer:
         
         return architecture
     
-    def _detect_issues(self, file_analysis: Dict[str, Any]) -> Dict[str, List[str]]:
-        """Detect potential issues in the codebase."""
+    def _detect_issues_and_feedback(self, file_analysis: Dict[str, Any]) -> Tuple[Dict[str, List[str]], Dict[str, str]]:
+        """Detect potential issues and generate specific feedback for each file in one pass."""
         issues = {
             'high_complexity_files': [],
             'missing_docstrings': [],
@@ -419,37 +669,55 @@ class ProjectAnalyzer:
             'large_files': [],
             'potential_bugs': []
         }
+        feedback = {}
         
         for file_path, info in file_analysis.items():
-            if info.get('type') != 'Python':
-                continue
-                
-            # High complexity files
-            if info.get('complexity', 0) > 10:
-                issues['high_complexity_files'].append(f"{file_path} (complexity: {info['complexity']})")
+            file_type = info.get('type', 'Unknown')
+            parts = [f"**{file_path}**\n- Type: {file_type}\n- Size: {info.get('size', 0)} bytes\n"]
             
-            # Missing docstrings
-            docstrings = info.get('docstrings', {})
-            if docstrings.get('total_functions', 0) > 0:
-                docstring_ratio = docstrings.get('functions', 0) / docstrings['total_functions']
-                if docstring_ratio < 0.5:
-                    issues['missing_docstrings'].append(f"{file_path} ({docstring_ratio:.1%} functions documented)")
-            
-            # Unused imports
-            unused = info.get('unused_imports', [])
-            if unused:
-                issues['unused_imports'].append(f"{file_path}: {', '.join(unused[:3])}{'...' if len(unused) > 3 else ''}")
-            
-            # Large files
-            if info.get('line_count', 0) > 500:
-                issues['large_files'].append(f"{file_path} ({info['line_count']} lines)")
+            if file_type == 'Python':
+                line_count = info.get('line_count')
+                if line_count is not None:
+                    parts.append(f"- Lines of code: {line_count}\n")
+                
+                if info.get('classes'):
+                    parts.append(f"- Classes: {len(info['classes'])}\n")
+                
+                if info.get('functions'):
+                    parts.append(f"- Functions: {len(info['functions'])}\n")
+                
+                # High complexity files
+                complexity = info.get('complexity', 0)
+                if complexity > 10:
+                    issues['high_complexity_files'].append(f"{file_path} (complexity: {complexity})")
+                    parts.append("- ⚠️  High complexity - consider refactoring\n")
+                
+                # Missing docstrings
+                docstrings = info.get('docstrings', {})
+                if docstrings.get('total_functions', 0) > 0:
+                    docstring_ratio = docstrings.get('functions', 0) / docstrings['total_functions']
+                    if docstring_ratio < 0.5:
+                        issues['missing_docstrings'].append(f"{file_path} ({docstring_ratio:.1%} functions documented)")
+                        parts.append(f"- ⚠️  Low docstring coverage ({docstring_ratio:.1%})\n")
+                
+                # Unused imports
+                unused = info.get('unused_imports', [])
+                if unused:
+                    issues['unused_imports'].append(f"{file_path}: {', '.join(unused[:3])}{'...' if len(unused) > 3 else ''}")
+                    parts.append(f"- ⚠️  Potential unused imports: {len(unused)}\n")
+                
+                # Large files
+                if (line_count or 0) > 500:
+                    issues['large_files'].append(f"{file_path} ({line_count} lines)")
+                
+                # Potential bugs (simple heuristics)
+                content = info.get('content_preview', '')
+                if 'TODO' in content or 'FIXME' in content or 'XXX' in content:
+                    issues['potential_bugs'].append(f"{file_path} contains TODO/FIXME comments")
             
-            # Potential bugs (simple heuristics)
-            content = info.get('content_preview', '')
-            if 'TODO' in content or 'FIXME' in content or 'XXX' in content:
-                issues['potential_bugs'].append(f"{file_path} contains TODO/FIXME comments")
+            feedback[file_path] = "".join(parts)
         
-        return issues
+        return issues, feedback
     
     def _generate_suggestions(self, file_analysis: Dict[str, Any], architecture: Dict[str, Any], issues: Dict[str, List[str]]) -> Dict[str, List[str]]:
         """Generate improvement suggestions."""
@@ -487,42 +755,6 @@ class ProjectAnalyzer:
         
         return suggestions
     
-    def _generate_file_feedback(self, file_analysis: Dict[str, Any]) -> Dict[str, str]:
-        """Generate specific feedback for each file."""
-        feedback = {}
-        
-        for file_path, info in file_analysis.items():
-            file_feedback = f"**{file_path}**\n"
-            file_feedback += f"- Type: {info.get('type', 'Unknown')}\n"
-            file_feedback += f"- Size: {info.get('size', 0)} bytes\n"
-            
-            if info.get('type') == 'Python':
-                if 'line_count' in info:
-                    file_feedback += f"- Lines of code: {info['line_count']}\n"
-                
-                if 'classes' in info and info['classes']:
-                    file_feedback += f"- Classes: {len(info['classes'])}\n"
-                
-                if 'functions' in info and info['functions']:
-                    file_feedback += f"- Functions: {len(info['functions'])}\n"
-                
-                # Specific feedback
-                if info.get('complexity', 0) > 10:
-                    file_feedback += "- ⚠️  High complexity - consider refactoring\n"
-                
-                docstrings = info.get('docstrings', {})
-                if docstrings.get('total_functions', 0) > 0:
-                    ratio = docstrings.get('functions', 0) / docstrings['total_functions']
-                    if ratio < 0.5:
-                        file_feedback += f"- ⚠️  Low docstring coverage ({ratio:.1%})\n"
-                
-                if info.get('unused_imports'):
-                    file_feedback += f"- ⚠️  Potential unused imports: {len(info['unused_imports'])}\n"
-            
-            feedback[file_path] = file_feedback
-        
-        return feedback
-    
     def _create_summary(self, file_analysis: Dict[str, Any], architecture: Dict[str, Any], issues: Dict[str, List[str]]) -> Dict[str, Any]:
         """Create a summary of the analysis."""
         return {
@@ -534,64 +766,64 @@ class ProjectAnalyzer:
             'test_coverage': len(architecture['test_files']) / max(1, architecture['total_files'])
         }
     
-    def format_analysis_results(self, results: Dict[str, Any]) -> str:
+    @staticmethod
+    def format_analysis_results(results: Dict[str, Any]) -> str:
         """Format the complete analysis results for display."""
-        output = "# Project Analysis Report\n\n"
+        parts = ["# Project Analysis Report\n\n"]
         
         # Summary
         summary = results['summary']
-        output += "## Summary\n"
-        output += f"- **Total Files:** {summary['total_files']}\n"
-        output += f"- **Total Lines:** {summary['total_lines']}\n"
-        output += f"- **Languages:** {', '.join([f'{lang}: {count}' for lang, count in summary['languages'].items()])}\n"
-        output += f"- **Issues Found:** {summary['issues_count']}\n"
-        output += f"- **Main Modules:** {summary['main_modules']}\n"
-        output += f"- **Test Coverage:** {summary['test_coverage']:.1%}\n\n"
+        languages = ', '.join([f'{lang}: {count}' for lang, count in summary['languages'].items()])
+        parts.append("## Summary\n"
+                     f"- **Total Files:** {summary['total_files']}\n"
+                     f"- **Total Lines:** {summary['total_lines']}\n"
+                     f"- **Languages:** {languages}\n"
+                     f"- **Issues Found:** {summary['issues_count']}\n"
+                     f"- **Main Modules:** {summary['main_modules']}\n"
+                     f"- **Test Coverage:** {summary['test_coverage']:.1%}\n\n")
         
         # Architecture
         arch = results['architecture']
-        output += "## Architecture Overview\n"
+        parts.append("## Architecture Overview\n")
         if arch['main_modules']:
-            output += f"**Main Modules:** {', '.join(arch['main_modules'][:5])}{'...' if len(arch['main_modules']) > 5 else ''}\n"
+            parts.append(f"**Main Modules:** {', '.join(arch['main_modules'][:5])}{'...' if len(arch['main_modules']) > 5 else ''}\n")
         if arch['utils_modules']:
-            output += f"**Utility Modules:** {', '.join(arch['utils_modules'][:5])}{'...' if len(arch['utils_modules']) > 5 else ''}\n"
+            parts.append(f"**Utility Modules:** {', '.join(arch['utils_modules'][:5])}{'...' if len(arch['utils_modules']) > 5 else ''}\n")
         if arch['test_files']:
-            output += f"**Test Files:** {len(arch['test_files'])}\n"
+            parts.append(f"**Test Files:** {len(arch['test_files'])}\n")
         if arch['config_files']:
-            output += f"**Configuration Files:** {', '.join(arch['config_files'])}\n\n"
+            parts.append(f"**Configuration Files:** {', '.join(arch['config_files'])}\n\n")
         
         # Issues
         issues = results['issues']
         if any(issues.values()):
-            output += "## Issues Detected\n"
+            parts.append("## Issues Detected\n")
             for category, issue_list in issues.items():
                 if issue_list:
-                    output += f"### {category.replace('_', ' ').title()}\n"
-                    for issue in issue_list[:10]:  # Limit to 10 per category
-                        output += f"- {issue}\n"
+                    parts.append(f"### {category.replace('_', ' ').title()}\n")
+                    parts.extend(f"- {issue}\n" for issue in issue_list[:10])  # Limit to 10 per category
                     if len(issue_list) > 10:
-                        output += f"- ... and {len(issue_list) - 10} more\n"
-                    output += "\n"
+                        parts.append(f"- ... and {len(issue_list) - 10} more\n")
+                    parts.append("\n")
         
         # Suggestions
         suggestions = results['suggestions']
         if any(suggestions.values()):
-            output += "## Improvement Suggestions\n"
+            parts.append("## Improvement Suggestions\n")
             for category, suggestion_list in suggestions.items():
                 if suggestion_list:
-                    output += f"### {category.title()}\n"
-                    for suggestion in suggestion_list:
-                        output += f"- {suggestion}\n"
-                    output += "\n"
+                    parts.append(f"### {category.title()}\n")
+                    parts.extend(f"- {suggestion}\n" for suggestion in suggestion_list)
+                    parts.append("\n")
         
         # File-specific feedback (first 10 files)
         feedback = results['file_feedback']
         if feedback:
-            output += "## File-Specific Feedback\n"
+            parts.append("## File-Specific Feedback\n")
             for i, (file_path, file_feedback) in enumerate(feedback.items()):
                 if i >= 10:  # Limit to first 10 files
-                    output += f"... and {len(feedback) - 10} more files analyzed\n"
+                    parts.append(f"... and {len(feedback) - 10} more files analyzed\n")
                     break
-                output += f"{file_feedback}\n"
+                parts.append(f"{file_feedback}\n")
         
-        return output
+        return "".join(parts)
@@ -4,17 +4,32 @@ import os
 SETTINGS_FILE = "settings.json"
 DEFAULT_SETTINGS = {
     "ollama_path": "ollama",
+    "ollama_host": "http://localhost:11434",
     "font_size": 14,
     "dark_theme": True,
-    "project_root": ".."
+    "project_root": "..",
+    "max_chat_blocks": 5000
 }
 
+_settings_cache = None  # last settings loaded or saved, so repeated loads skip the disk
+
 def load_settings():
-    if os.path.exists(SETTINGS_FILE):
-        with open(SETTINGS_FILE, "r") as f:
-            return json.load(f)
-    return DEFAULT_SETTINGS.copy()
+    global _settings_cache
+    if _settings_cache is None:
+        if os.path.exists(SETTINGS_FILE):
+            with open(SETTINGS_FILE, "r") as f:
+                _settings_cache = json.load(f)
+        else:
+            _settings_cache = DEFAULT_SETTINGS.copy()
+    # Callers change their settings dict in place, so never hand out the cached one
+    return dict(_settings_cache)
 
 def save_settings(settings):
-    with open(SETTINGS_FILE, "w") as f:
-        json.dump(settings, f, indent=4)
+    global _settings_cache
+    # Serialize first, then swap the file in so a crash can't leave it half-written
+    data = json.dumps(settings, indent=4).encode("utf-8")
+    tmp_path = SETTINGS_FILE + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, SETTINGS_FILE)
+    _settings_cache = dict(settings)
@@ -1,16 +1,91 @@
 import re
+import shutil
 import subprocess
 import json
+import threading
+import time
 
-def clean_output(text):
-    text = re.sub(r'[\u2800-\u28FF]', '', text)
-    text = re.sub(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])', '', text)
-    return text
+try:
+    import hyperscan
+except ImportError:  # optional dependency, fall back to re
+    hyperscan = None
 
-def get_ollama_models(ollama_path: str = "ollama"):
+# Terminal noise in raw CLI output: ANSI escape sequences and the UTF-8
+# encoding of braille spinner characters (U+2800-U+28FF), matched in one pass
+_ANSI_BYTES_PATTERN = rb'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])'
+_BRAILLE_BYTES_PATTERN = rb'\xE2[\xA0-\xA3][\x80-\xBF]'
+_OUTPUT_NOISE_BYTES_RE = re.compile(_ANSI_BYTES_PATTERN + b'|' + _BRAILLE_BYTES_PATTERN)
+
+def _build_noise_database():
+    """Compile the output noise patterns into a Hyperscan block-mode database."""
+    db = hyperscan.Database()
+    db.compile(
+        expressions=[_ANSI_BYTES_PATTERN, _BRAILLE_BYTES_PATTERN],
+        ids=[0, 1],
+        elements=2,
+        flags=[hyperscan.HS_FLAG_SOM_LEFTMOST] * 2,
+    )
+    return db
+
+_NOISE_DB = _build_noise_database() if hyperscan is not None else None
+# Below this size the per-call scan setup costs more than re spends on the whole chunk
+_HYPERSCAN_MIN_BYTES = 1024
+_hs_local = threading.local()  # Hyperscan scratch space can't be shared between threads
+
+def _collect_span(pattern_id, start, end, flags, spans):
+    spans.append((start, end))
+
+def _strip_spans_hyperscan(data: bytes) -> bytes:
+    """Remove noise matches found by the Hyperscan database."""
+    scratch = getattr(_hs_local, 'scratch', None)
+    if scratch is None:
+        scratch = _hs_local.scratch = hyperscan.Scratch(_NOISE_DB)
+    spans = []  # (start, end) of every match, filled in by _collect_span
+    _NOISE_DB.scan(data, match_event_handler=_collect_span, context=spans, scratch=scratch)
+    if not spans:
+        return data
+    # Keep the leftmost non-overlapping matches, as re.sub would
+    spans.sort()
+    view = memoryview(data)
+    out = bytearray()
+    pos = 0
+    for start, end in spans:
+        if start < pos:
+            continue
+        out += view[pos:start]
+        pos = end
+    out += view[pos:]
+    return bytes(out)
+
+def clean_output_bytes(data: bytes) -> bytes:
+    """Strip terminal noise from raw output before it is decoded."""
+    # Every match starts with ESC or 0xE2; most chunks contain neither, and two
+    # byte scans are much cheaper than running the regex over the whole chunk
+    if b'\x1b' not in data and b'\xe2' not in data:
+        return data
+    if _NOISE_DB is not None and len(data) >= _HYPERSCAN_MIN_BYTES:
+        return _strip_spans_hyperscan(data)
+    return _OUTPUT_NOISE_BYTES_RE.sub(b'', data)
+
+_models_cache = {}  # ollama_path -> (time.monotonic() of the lookup, model names)
+
+def get_ollama_models(ollama_path: str = "ollama", ttl: float = 5.0, force: bool = False):
     """Return a list of locally available Ollama model names.
     Tries JSON format first, falls back to parsing plain text.
+    Results are reused for ttl seconds unless force is set.
     """
+    now = time.monotonic()
+    cached = _models_cache.get(ollama_path)
+    if not force and cached is not None and now - cached[0] < ttl:
+        return list(cached[1])
+    names = _list_ollama_models(ollama_path)
+    _models_cache[ollama_path] = (now, names)
+    return list(names)
+
+def _list_ollama_models(ollama_path: str):
+    """Ask the ollama CLI for its installed models."""
+    if shutil.which(ollama_path) is None:
+        return []  # no executable to run, so don't try either format
     try:
         # Prefer JSON output when available
         result = subprocess.run(